@@ -1,17 +1,47 @@
 from fastapi import Request, HTTPException, status
 from fastapi.responses import RedirectResponse
-from linguist.db_helpers import supabase
-from typing import Optional, Dict, Any
+from linguist.db_helpers import supabase, session_client, user_postgrest, _sb
+from typing import Optional, Dict, Any, Tuple
+from cachetools import TTLCache
+from supabase_auth import SyncMemoryStorage
+from supabase_auth.constants import STORAGE_KEY
+import hashlib
+import time
+import jwt
 import os
 
+NGROK_URL = os.getenv("NGROK_URL", "http://localhost:5017")
+OAUTH_REDIRECT_TO = NGROK_URL + "/linguist/auth/callback"
+
+# Verified users keyed by SHA-256 of their access token
+_user_cache = TTLCache(maxsize=10000, ttl=30)
+
+def _token_key(access_token: str) -> str:
+    """Hash an access token for use as a cache key"""
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+def _token_expired(access_token: str) -> bool:
+    """Check the token's exp claim locally (signature is verified by Supabase)"""
+    try:
+        claims = jwt.decode(access_token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return True
+    return claims.get("exp", 0) <= time.time()
+
+def invalidate_cached_user(access_token: Optional[str]):
+    """Drop a token's cached user, e.g. on logout"""
+    if access_token:
+        _user_cache.pop(_token_key(access_token), None)
+
 async def create_user_account(email: str, password: str, phone: Optional[str] = None) -> Dict[str, Any]:
     """Create a new user account with Supabase Auth"""
     try:
         # Sign up with Supabase Auth
-        auth_response = supabase.auth.sign_up({
+        client = session_client()
+        auth_response = await _sb(lambda: client.auth.sign_up({
             "email": email,
             "password": password
-        })
+        }))
 
         if auth_response.user:
             # Insert into User table with linguist role
@@ -25,7 +55,11 @@ async def create_user_account(email: str, password: str, phone: Optional[str] =
             # Use the Supabase auth user ID as the primary key
             user_data['id'] = auth_response.user.id
 
-            supabase.table('users').insert(user_data).execute()
+            # Insert as the new user when sign-up returned a session (anon otherwise)
+            access_token = auth_response.session.access_token if auth_response.session else None
+
+            db = user_postgrest(access_token)
+            await _sb(lambda: db.table('users').insert(user_data).execute())
 
             return {"success": True, "user": auth_response.user}
         else:
@@ -37,10 +71,11 @@ async def create_user_account(email: str, password: str, phone: Optional[str] =
 async def login_user(email: str, password: str) -> Dict[str, Any]:
     """Login user with Supabase Auth"""
     try:
-        auth_response = supabase.auth.sign_in_with_password({
+        client = session_client()
+        auth_response = await _sb(lambda: client.auth.sign_in_with_password({
             "email": email,
             "password": password
-        })
+        }))
 
         if auth_response.session:
             return {
@@ -61,13 +96,24 @@ async def get_current_user(request: Request) -> Optional[Dict[str, Any]]:
         if not access_token:
             return None
 
+        key = _token_key(access_token)
+        if _token_expired(access_token):
+            _user_cache.pop(key, None)
+            return None
+
+        cached = _user_cache.get(key)
+        if cached is not None:
+            return cached
+
         # Verify token with Supabase
-        user_response = supabase.auth.get_user(access_token)
+        user_response = await _sb(lambda: supabase.auth.get_user(access_token))
 
         if user_response.user:
             # Get full user details from users table
-            db_user = supabase.table('users').select('*').eq('id', user_response.user.id).execute()
+            db = user_postgrest(access_token)
+            db_user = await _sb(lambda: db.table('users').select('*').eq('id', user_response.user.id).execute())
             if db_user.data:
+                _user_cache[key] = db_user.data[0]
                 return db_user.data[0]
 
         return None
@@ -77,7 +123,7 @@ async def get_current_user(request: Request) -> Optional[Dict[str, Any]]:
 
 async def require_auth(request: Request):
     """Dependency to require authentication"""
-    user = await get_current_user(request)
+    user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -91,42 +137,45 @@ def redirect_if_not_authenticated(user: Optional[Dict[str, Any]]):
         return RedirectResponse(url="/linguist/login", status_code=303)
     return None
 
-async def get_google_oauth_url() -> str:
-    """Get Google OAuth URL from Supabase"""
+async def get_google_oauth_url() -> Tuple[str, Optional[str]]:
+    """Get Google OAuth URL from Supabase, plus the PKCE code verifier the callback needs"""
     try:
-        redirect_to = os.getenv("NGROK_URL", "http://localhost:5017") + "/linguist/auth/callback"
-
-        # Supabase provides OAuth URLs
-        response = supabase.auth.sign_in_with_oauth({
+        # Supabase provides OAuth URLs; the verifier is generated per login flow, so
+        # hand it back for the caller to keep (in a cookie) rather than in server memory
+        storage = SyncMemoryStorage()
+        client = session_client(storage)
+        response = await _sb(lambda: client.auth.sign_in_with_oauth({
             "provider": "google",
             "options": {
-                "redirect_to": redirect_to
+                "redirect_to": OAUTH_REDIRECT_TO
             }
-        })
+        }))
 
-        return response.url if hasattr(response, 'url') else ""
+        url = response.url if hasattr(response, 'url') else ""
+        return url, storage.get_item(f"{STORAGE_KEY}-code-verifier")
     except Exception as e:
         print(f"Google OAuth error: {e}")
-        return ""
+        return "", None
 
-async def handle_oauth_callback(code: str) -> Dict[str, Any]:
+async def handle_oauth_callback(code: str, code_verifier: Optional[str]) -> Dict[str, Any]:
     """Handle OAuth callback and create/update user"""
     try:
         # Exchange code for session
-        response = supabase.auth.exchange_code_for_session({"auth_code": code})
+        client = session_client()
+        response = await _sb(lambda: client.auth.exchange_code_for_session({
+            "auth_code": code,
+            "code_verifier": code_verifier
+        }))
 
         if response.session and response.user:
-            # Check if user exists in users table
-            db_user = supabase.table('users').select('*').eq('id', response.user.id).execute()
-
-            if not db_user.data:
-                # Create new user record
-                user_data = {
-                    'id': response.user.id,
-                    'email': response.user.email,
-                    'user_role': 'linguist'
-                }
-                supabase.table('users').insert(user_data).execute()
+            # Create the user record if it doesn't exist yet (no-op for returning users)
+            user_data = {
+                'id': response.user.id,
+                'email': response.user.email,
+                'user_role': 'linguist'
+            }
+            db = user_postgrest(response.session.access_token)
+            await _sb(lambda: db.table('users').upsert(user_data, on_conflict='id', ignore_duplicates=True).execute())
 
             return {
                 "success": True,
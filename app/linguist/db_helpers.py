@@ -1,80 +1,335 @@
 import os
+import orjson
+import asyncio
+import functools
+import asyncpg
+import httpx
+import jwt
 from dotenv import load_dotenv
-from supabase import create_client
+from fastapi import Request
+from supabase import create_client, ClientOptions, Client
+from supabase_auth import SyncMemoryStorage
+from postgrest import SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from cachetools import TTLCache
+from aiodataloader import DataLoader
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
 
 load_dotenv()
 
-supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_ANON_KEY"))
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
+
+# Shared keep-alive pool so PostgREST/GoTrue calls reuse TCP+TLS connections
+httpx_client = httpx.Client(
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30),
+    http2=True,
+    timeout=10
+)
+
+# Shared client; it only ever carries the anon key, never a user's session
+supabase = create_client(
+    SUPABASE_URL,
+    SUPABASE_ANON_KEY,
+    options=ClientOptions(httpx_client=httpx_client)
+)
+
+def session_client(storage: Optional[SyncMemoryStorage] = None) -> Client:
+    """Short-lived client for auth calls that establish a session (sign-up, sign-in, OAuth).
+    supabase-py rewrites a client's Authorization header on sign-in, so doing this on the
+    shared client would send that user's JWT with other requests' queries. Pass storage
+    to read back what the call stored, e.g. the OAuth PKCE code verifier."""
+    return create_client(
+        SUPABASE_URL,
+        SUPABASE_ANON_KEY,
+        options=ClientOptions(
+            httpx_client=httpx_client,
+            storage=storage or SyncMemoryStorage(),
+            persist_session=False,
+            auto_refresh_token=False
+        )
+    )
+
+def user_postgrest(access_token: Optional[str]) -> SyncPostgrestClient:
+    """PostgREST client authorized as the given user (anon without a token), so RLS applies
+    to that user. Headers go out per request, so it can share the keep-alive pool."""
+    return SyncPostgrestClient(
+        f"{SUPABASE_URL}/rest/v1",
+        headers={
+            **DEFAULT_POSTGREST_CLIENT_HEADERS,
+            "apikey": SUPABASE_ANON_KEY,
+            "Authorization": f"Bearer {access_token or SUPABASE_ANON_KEY}"
+        },
+        http_client=httpx_client
+    )
+
+# Direct Postgres access for hot read paths (Supavisor transaction pooler, port 6543)
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+
+pool: Optional[asyncpg.Pool] = None
+
+async def _init_connection(conn: asyncpg.Connection):
+    """Decode json columns the same way PostgREST embeds do"""
+    await conn.set_type_codec(
+        'json',
+        encoder=lambda value: orjson.dumps(value).decode(),
+        decoder=orjson.loads,
+        schema='pg_catalog'
+    )
+
+async def init_pool():
+    """Create the asyncpg pool (called on app startup)"""
+    global pool
+    if not SUPABASE_DB_URL:
+        raise RuntimeError(
+            "SUPABASE_DB_URL is not set; point it at the Supabase transaction pooler "
+            "(postgres://...pooler.supabase.com:6543/postgres)"
+        )
+    if pool is None:
+        # The transaction pooler can't hold prepared statements across transactions
+        pool = await asyncpg.create_pool(
+            SUPABASE_DB_URL,
+            min_size=2,
+            max_size=10,
+            max_inactive_connection_lifetime=1800,
+            statement_cache_size=0,
+            init=_init_connection
+        )
+
+async def close_pool():
+    """Close the asyncpg pool (called on app shutdown)"""
+    global pool
+    if pool is not None:
+        await pool.close()
+        pool = None
+
+def _jwt_claims(access_token: str) -> Dict[str, Any]:
+    """Claims of an access token (already verified against Supabase by auth.get_current_user)"""
+    return jwt.decode(access_token, options={"verify_signature": False})
+
+async def _fetch_as_user(claims: Dict[str, Any], query: str, *args) -> List[asyncpg.Record]:
+    """Run a query as the authenticated role with the user's JWT claims, the way PostgREST
+    does, so the RLS policies still decide which rows the user can see"""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                "SELECT set_config('role', 'authenticated', true), set_config('request.jwt.claims', $1, true)",
+                orjson.dumps(claims).decode()
+            )
+            return await conn.fetch(query, *args)
+
+# Short-lived caches for the list-all reads, keyed by function name and user
+_projects_cache = TTLCache(maxsize=1024, ttl=30)
+_campaigns_cache = TTLCache(maxsize=1024, ttl=30)
+_responses_cache = TTLCache(maxsize=1024, ttl=30)
+
+# Fetches currently in progress, so concurrent callers with the same key share one
+_inflight: Dict[str, asyncio.Future] = {}
+
+# Rows per page for keyset-paginated lists (cursor is the last row's (created_at, id))
+PAGE_SIZE = 50
+
+async def _singleflight(key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Run fetch once for all concurrent callers with the same key and share its result"""
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(fetch())
+        _inflight[key] = fut
+
+        def forget(done: asyncio.Future):
+            if _inflight.get(key) is done:
+                del _inflight[key]
+            # Mark a failure as retrieved in case every waiter was cancelled
+            if not done.cancelled():
+                done.exception()
+
+        fut.add_done_callback(forget)
+    # Shield so one caller being cancelled doesn't cancel the fetch for the others
+    return await asyncio.shield(fut)
+
+# Bumped on every invalidation (keyed by id of the cache) so fetches started
+# before a write don't store their stale result afterwards
+_cache_generations: Dict[int, int] = {}
 
-async def get_all_projects() -> List[Dict[str, Any]]:
-    """Fetch all projects from database"""
+_MISSING = object()
+
+async def _cached_fetch(cache: TTLCache, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Return a cached value, populating it through a single shared fetch on miss"""
+    # One lookup, so the entry can't expire between a membership check and the read
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    generation = _cache_generations.get(id(cache), 0)
+
+    async def populate():
+        value = await fetch()
+        if _cache_generations.get(id(cache), 0) == generation:
+            cache[key] = value
+        return value
+
+    return await _singleflight(key, populate)
+
+def _invalidate(cache: TTLCache, key_prefix: str):
+    """Drop cached and in-flight reads after a write so later callers refetch"""
+    _cache_generations[id(cache)] = _cache_generations.get(id(cache), 0) + 1
+    cache.clear()
+    for key in [key for key in _inflight if key.startswith(key_prefix)]:
+        del _inflight[key]
+
+async def _sb(call: Callable[[], Any]) -> Any:
+    """Run a blocking supabase-py call in a worker thread so it doesn't stall the event loop"""
+    return await asyncio.to_thread(call)
+
+def _records_to_dicts(records: List[asyncpg.Record]) -> List[Dict[str, Any]]:
+    """Convert rows to dicts, serializing timestamps as ISO strings like PostgREST"""
+    return [
+        {k: v.isoformat() if isinstance(v, datetime) else v for k, v in record.items()}
+        for record in records
+    ]
+
+async def get_all_projects(access_token: str, before: Optional[Tuple[datetime, int]] = None) -> List[Dict[str, Any]]:
+    """Fetch a page of the user's visible projects, newest first, after the given (created_at, id) cursor"""
+    before_at, before_id = before or (None, None)
     try:
-        result = supabase.table('projects').select('*').order('created_at', desc=True).execute()
-        return result.data if result.data else []
+        claims = _jwt_claims(access_token)
+
+        async def fetch():
+            records = await _fetch_as_user(claims, """
+                SELECT id, title, ui_language, target_language, created_at
+                FROM projects
+                WHERE $1::timestamp IS NULL OR (created_at, id) < ($1::timestamp, $2::bigint)
+                ORDER BY created_at DESC, id DESC
+                LIMIT $3
+            """, before_at, before_id, PAGE_SIZE)
+            return _records_to_dicts(records)
+
+        return await _cached_fetch(_projects_cache, f"get_all_projects:{claims['sub']}:{before}", fetch)
     except Exception as e:
         print(f"Error fetching projects: {e}")
         return []
 
-async def create_project(title: str, ui_language: str, target_language: str, created_by: Optional[int] = None) -> Dict[str, Any]:
+async def create_project(access_token: str, title: str, ui_language: str, target_language: str, created_by: Optional[int] = None) -> Dict[str, Any]:
     """Insert new project into database"""
     try:
         project_data = {
             'title': title,
             'ui_language': ui_language,
-            'target_language': target_language,
-            'created_at': datetime.utcnow().isoformat()
+            'target_language': target_language
         }
         if created_by:
             project_data['created_by'] = created_by
 
-        result = supabase.table('projects').insert(project_data).execute()
+        db = user_postgrest(access_token)
+        result = await _sb(lambda: db.table('projects').insert(project_data).execute())
+        _invalidate(_projects_cache, 'get_all_projects:')
         return result.data[0] if result.data else {}
     except Exception as e:
         print(f"Error creating project: {e}")
         raise e
 
-async def get_project_campaigns(project_id: int) -> List[Dict[str, Any]]:
-    """Fetch campaigns for a specific project"""
+async def get_project_campaigns(access_token: str, project_id: int, before: Optional[Tuple[datetime, int]] = None) -> List[Dict[str, Any]]:
+    """Fetch a page of campaigns for a specific project, after the given (created_at, id) cursor"""
     try:
-        result = supabase.table('campaigns').select('*').eq('project_id', project_id).order('created_at', desc=True).execute()
-        return result.data if result.data else []
+        async def fetch():
+            query = user_postgrest(access_token).table('campaigns').select('id,project_id,name,active,created_at').eq('project_id', project_id)
+            if before:
+                before_at, before_id = before[0].isoformat(), before[1]
+                query = query.or_(f'created_at.lt."{before_at}",and(created_at.eq."{before_at}",id.lt.{before_id})')
+            result = await _sb(lambda: query.order('created_at', desc=True).order('id', desc=True).limit(PAGE_SIZE).execute())
+            return result.data if result.data else []
+
+        claims = _jwt_claims(access_token)
+        return await _singleflight(f"get_project_campaigns:{claims['sub']}:{project_id}:{before}", fetch)
     except Exception as e:
         print(f"Error fetching campaigns: {e}")
         return []
 
-async def get_all_campaigns() -> List[Dict[str, Any]]:
-    """Fetch all campaigns with project info"""
+async def get_all_campaigns(access_token: str, before: Optional[Tuple[datetime, int]] = None) -> List[Dict[str, Any]]:
+    """Fetch a page of the user's visible campaigns with project info, after the given (created_at, id) cursor"""
+    before_at, before_id = before or (None, None)
     try:
-        result = supabase.table('campaigns').select('*, projects(title)').order('created_at', desc=True).execute()
-        return result.data if result.data else []
+        claims = _jwt_claims(access_token)
+
+        async def fetch():
+            records = await _fetch_as_user(claims, """
+                SELECT c.id, c.name, c.active, c.created_at,
+                       CASE WHEN p.id IS NULL THEN NULL ELSE json_build_object('title', p.title) END AS projects
+                FROM campaigns c
+                LEFT JOIN projects p ON p.id = c.project_id
+                WHERE $1::timestamp IS NULL OR (c.created_at, c.id) < ($1::timestamp, $2::bigint)
+                ORDER BY c.created_at DESC, c.id DESC
+                LIMIT $3
+            """, before_at, before_id, PAGE_SIZE)
+            return _records_to_dicts(records)
+
+        return await _cached_fetch(_campaigns_cache, f"get_all_campaigns:{claims['sub']}:{before}", fetch)
     except Exception as e:
         print(f"Error fetching campaigns: {e}")
         return []
 
-async def get_campaign_responses(campaign_id: int) -> List[Dict[str, Any]]:
-    """Fetch responses for a specific campaign"""
+async def batch_load_campaign_response_counts(access_token: str, campaign_ids: List[int]) -> List[Optional[int]]:
+    """Count the user's visible responses for many campaigns in one query (DataLoader batch function)"""
     try:
-        # Get questions in this campaign first
-        campaign_questions = supabase.table('campaign_questions').select('question_id').eq('campaign_id', campaign_id).execute()
-        question_ids = [q['question_id'] for q in campaign_questions.data] if campaign_questions.data else []
+        records = await _fetch_as_user(_jwt_claims(access_token), """
+            SELECT cq.campaign_id, count(r.id) AS response_count
+            FROM campaign_questions cq
+            JOIN responses r ON r.question_id = cq.question_id
+            WHERE cq.campaign_id = ANY($1::bigint[])
+            GROUP BY cq.campaign_id
+        """, campaign_ids)
+        counts = {record['campaign_id']: record['response_count'] for record in records}
+        return [counts.get(campaign_id, 0) for campaign_id in campaign_ids]
+    except Exception as e:
+        print(f"Error counting campaign responses: {e}")
+        return [None] * len(campaign_ids)
 
-        if not question_ids:
-            return []
+async def response_count_loader(request: Request) -> DataLoader:
+    """Dependency providing a per-request loader; loads in the same tick share one query"""
+    # async so FastAPI builds it on the request's event loop rather than in a worker thread
+    access_token = request.cookies.get("access_token")
+    return DataLoader(functools.partial(batch_load_campaign_response_counts, access_token))
 
-        # Get responses for those questions
-        result = supabase.table('responses').select('*, questions(input_text)').in_('question_id', question_ids).order('created_at', desc=True).execute()
-        return result.data if result.data else []
+async def get_campaign_responses(access_token: str, campaign_id: int) -> List[Dict[str, Any]]:
+    """Fetch the user's visible responses for a specific campaign"""
+    try:
+        claims = _jwt_claims(access_token)
+
+        async def fetch():
+            records = await _fetch_as_user(claims, """
+                SELECT r.id, r.user_id, r.response_text, r.response_type, r.quality_flag, r.created_at,
+                       json_build_object('input_text', q.input_text) AS questions
+                FROM responses r
+                JOIN questions q ON q.id = r.question_id
+                JOIN campaign_questions cq ON cq.question_id = q.id
+                WHERE cq.campaign_id = $1
+                ORDER BY r.created_at DESC
+            """, campaign_id)
+            return _records_to_dicts(records)
+
+        return await _singleflight(f"get_campaign_responses:{claims['sub']}:{campaign_id}", fetch)
     except Exception as e:
         print(f"Error fetching responses: {e}")
         return []
 
-async def get_all_responses() -> List[Dict[str, Any]]:
-    """Fetch all responses with question info"""
+async def get_all_responses(access_token: str) -> List[Dict[str, Any]]:
+    """Fetch the user's visible responses with question info"""
     try:
-        result = supabase.table('responses').select('*, questions(input_text)').order('created_at', desc=True).limit(100).execute()
-        return result.data if result.data else []
+        claims = _jwt_claims(access_token)
+
+        async def fetch():
+            records = await _fetch_as_user(claims, """
+                SELECT r.id, r.user_id, r.response_text, r.response_type, r.quality_flag, r.created_at,
+                       CASE WHEN q.id IS NULL THEN NULL ELSE json_build_object('input_text', q.input_text) END AS questions
+                FROM responses r
+                LEFT JOIN questions q ON q.id = r.question_id
+                ORDER BY r.created_at DESC
+                LIMIT 100
+            """)
+            return _records_to_dicts(records)
+
+        return await _cached_fetch(_responses_cache, f"get_all_responses:{claims['sub']}", fetch)
     except Exception as e:
         print(f"Error fetching responses: {e}")
         return []
@@ -1,16 +1,90 @@
-from fastapi import APIRouter, Request, Form, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Request, Form, Response, Depends, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from typing import Optional
-import os
+from jinja2 import Environment, FileSystemBytecodeCache, PackageLoader
+from typing import Optional, Dict, Any, Tuple, Iterator
+from datetime import datetime, timezone
+from aiodataloader import DataLoader
+import hashlib
+import html
+import itertools
+import orjson
 
 from linguist import db_helpers, auth
 
 router = APIRouter(prefix="/linguist", tags=["linguist"])
 
-# Get absolute path to templates directory
-templates_dir = os.path.join(os.path.dirname(__file__), "templates")
-templates = Jinja2Templates(directory=templates_dir)
+# Templates ship with the package and don't change at runtime, so skip per-render
+# mtime checks; compiled templates persist on disk so every worker reuses them
+env = Environment(
+    loader=PackageLoader("linguist", "templates"),
+    autoescape=True,
+    auto_reload=False,
+    cache_size=400,
+    bytecode_cache=FileSystemBytecodeCache()
+)
+templates = Jinja2Templates(env=env)
+
+project_row_tpl = templates.get_template("_project_row.html")
+
+def warm_templates():
+    """Compile all templates up front (called on app startup)"""
+    for name in templates.env.list_templates():
+        templates.env.get_template(name)
+
+# Jinja yields one piece per text run and expression; send them in chunks of about this size
+STREAM_CHUNK_SIZE = 16 * 1024
+
+def _chunked(pieces: Iterator[str]) -> Iterator[str]:
+    """Join rendered pieces into STREAM_CHUNK_SIZE chunks"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+def stream_template(name: str, context: dict) -> StreamingResponse:
+    """Render a template incrementally so HTML is flushed as rows are produced.
+    The first chunk is rendered here, so errors in it still reach the caller's except."""
+    chunks = _chunked(templates.get_template(name).generate(context))
+    first = next(chunks, "")
+    return StreamingResponse(itertools.chain([first], chunks), media_type="text/html")
+
+def page_etag(*parts) -> str:
+    """ETag over the data a page renders, so unchanged pages can be answered with 304"""
+    return '"' + hashlib.md5(orjson.dumps(parts)).hexdigest() + '"'
+
+def cached_page(request: Request, etag: str, name: str, context: dict) -> Response:
+    """Return 304 if the client already has this page, else stream it with caching headers"""
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=15"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    resp = stream_template(name, context)
+    resp.headers.update(headers)
+    return resp
+
+def page_cursor(before: Optional[datetime], before_id: Optional[int]) -> Optional[Tuple[datetime, int]]:
+    """Build the (created_at, id) keyset cursor from ?before=&before_id=, as naive UTC like the column"""
+    if before is None and before_id is None:
+        return None
+    if before is None or before_id is None:
+        raise HTTPException(
+            status_code=422,
+            detail="before and before_id must be given together"
+        )
+    if before.tzinfo is not None:
+        before = before.astimezone(timezone.utc).replace(tzinfo=None)
+    return before, before_id
+
+def next_page_cursor(rows: list) -> Optional[Dict[str, Any]]:
+    """Return the query params for the next page, or None on the last page"""
+    if len(rows) < db_helpers.PAGE_SIZE:
+        return None
+    return {"before": rows[-1]['created_at'], "before_id": rows[-1]['id']}
 
 # Auth routes
 @router.get("/login", response_class=HTMLResponse)
@@ -68,31 +142,42 @@ async def signup(
         })
 
 @router.get("/logout")
-async def logout():
+async def logout(request: Request):
     """Logout user"""
+    auth.invalidate_cached_user(request.cookies.get("access_token"))
     resp = RedirectResponse(url="/linguist/login", status_code=303)
     resp.delete_cookie("access_token")
     return resp
 
 @router.get("/auth/google")
-async def google_login():
+async def google_login(response: Response):
     """Initiate Google OAuth login"""
-    url = await auth.get_google_oauth_url()
+    url, code_verifier = await auth.get_google_oauth_url()
     if url:
+        # PKCE verifier for this login, sent back to us on the callback redirect
+        if code_verifier:
+            response.set_cookie(
+                key="oauth_code_verifier",
+                value=code_verifier,
+                httponly=True,
+                max_age=600,
+                samesite="lax"
+            )
         return {"url": url}
     else:
         return {"error": "Failed to get Google OAuth URL"}
 
 @router.get("/auth/callback")
-async def oauth_callback(code: str = None):
+async def oauth_callback(request: Request, code: str = None):
     """Handle OAuth callback"""
     if not code:
         return RedirectResponse(url="/linguist/login?error=no_code", status_code=303)
 
-    result = await auth.handle_oauth_callback(code)
+    result = await auth.handle_oauth_callback(code, request.cookies.get("oauth_code_verifier"))
 
     if result["success"]:
         resp = RedirectResponse(url="/linguist/projects", status_code=303)
+        resp.delete_cookie("oauth_code_verifier")
         resp.set_cookie(
             key="access_token",
             value=result["session"].access_token,
@@ -110,30 +195,33 @@ async def oauth_callback(code: str = None):
 @router.get("/", response_class=HTMLResponse)
 async def linguist_home(request: Request):
     """Redirect to projects page"""
-    user = await auth.get_current_user(request)
+    user = request.state.user
     redirect = auth.redirect_if_not_authenticated(user)
     if redirect:
         return redirect
     return RedirectResponse(url="/linguist/projects")
 
 @router.get("/projects", response_class=HTMLResponse)
-async def list_projects(request: Request):
-    """List all projects"""
-    user = await auth.get_current_user(request)
+async def list_projects(request: Request, before: Optional[datetime] = None, before_id: Optional[int] = None):
+    """List projects, one page at a time"""
+    user = request.state.user
     redirect = auth.redirect_if_not_authenticated(user)
     if redirect:
         return redirect
 
+    cursor = page_cursor(before, before_id)
     try:
-        projects = await db_helpers.get_all_projects()
-        return templates.TemplateResponse("projects.html", {
+        projects = await db_helpers.get_all_projects(request.cookies.get("access_token"), cursor)
+        etag = page_etag(user['id'], projects)
+        return cached_page(request, etag, "projects.html", {
             "request": request,
             "projects": projects,
+            "next_page": next_page_cursor(projects),
             "user": user
         })
     except Exception as e:
         print(f"Error in list_projects: {e}")
-        return templates.TemplateResponse("projects.html", {
+        return stream_template("projects.html", {
             "request": request,
             "projects": [],
             "error": str(e),
@@ -148,43 +236,46 @@ async def create_project(
     target_language: str = Form(...)
 ):
     """Create new project and return HTMX partial"""
-    user = await auth.get_current_user(request)
+    user = request.state.user
     if not user:
         return '<tr><td colspan="5" style="color: red;">Not authenticated</td></tr>'
 
     try:
-        project = await db_helpers.create_project(title, ui_language, target_language, user['id'])
-        return f"""
-        <tr>
-            <td>{project.get('id', 'N/A')}</td>
-            <td>{project.get('title', '')}</td>
-            <td>{project.get('ui_language', '')}</td>
-            <td>{project.get('target_language', '')}</td>
-            <td>{project.get('created_at', '')[:10] if project.get('created_at') else 'N/A'}</td>
-        </tr>
-        """
+        project = await db_helpers.create_project(request.cookies.get("access_token"), title, ui_language, target_language, user['id'])
+        return HTMLResponse(project_row_tpl.render(project=project))
     except Exception as e:
         print(f"Error creating project: {e}")
-        return f'<tr><td colspan="5" style="color: red;">Error: {str(e)}</td></tr>'
+        return f'<tr><td colspan="5" style="color: red;">Error: {html.escape(str(e))}</td></tr>'
 
 @router.get("/campaigns", response_class=HTMLResponse)
-async def list_campaigns(request: Request):
-    """List all campaigns"""
-    user = await auth.get_current_user(request)
+async def list_campaigns(
+    request: Request,
+    before: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    response_count_loader: DataLoader = Depends(db_helpers.response_count_loader)
+):
+    """List campaigns, one page at a time"""
+    user = request.state.user
     redirect = auth.redirect_if_not_authenticated(user)
     if redirect:
         return redirect
 
+    cursor = page_cursor(before, before_id)
     try:
-        campaigns = await db_helpers.get_all_campaigns()
-        return templates.TemplateResponse("campaigns.html", {
+        campaigns = await db_helpers.get_all_campaigns(request.cookies.get("access_token"), cursor)
+        campaign_ids = [campaign['id'] for campaign in campaigns]
+        counts = await response_count_loader.load_many(campaign_ids)
+        etag = page_etag(user['id'], campaigns, counts)
+        return cached_page(request, etag, "campaigns.html", {
             "request": request,
             "campaigns": campaigns,
+            "response_counts": dict(zip(campaign_ids, counts)),
+            "next_page": next_page_cursor(campaigns),
             "user": user
         })
     except Exception as e:
         print(f"Error in list_campaigns: {e}")
-        return templates.TemplateResponse("campaigns.html", {
+        return stream_template("campaigns.html", {
             "request": request,
             "campaigns": [],
             "error": str(e),
@@ -194,7 +285,7 @@ async def list_campaigns(request: Request):
 @router.get("/questions", response_class=HTMLResponse)
 async def list_questions(request: Request):
     """List all questions"""
-    user = await auth.get_current_user(request)
+    user = request.state.user
     redirect = auth.redirect_if_not_authenticated(user)
     if redirect:
         return redirect
@@ -208,21 +299,21 @@ async def list_questions(request: Request):
 @router.get("/responses", response_class=HTMLResponse)
 async def list_responses(request: Request):
     """List all responses"""
-    user = await auth.get_current_user(request)
+    user = request.state.user
     redirect = auth.redirect_if_not_authenticated(user)
     if redirect:
         return redirect
 
     try:
-        responses = await db_helpers.get_all_responses()
-        return templates.TemplateResponse("responses.html", {
+        responses = await db_helpers.get_all_responses(request.cookies.get("access_token"))
+        return stream_template("responses.html", {
             "request": request,
             "responses": responses,
             "user": user
         })
     except Exception as e:
         print(f"Error in list_responses: {e}")
-        return templates.TemplateResponse("responses.html", {
+        return stream_template("responses.html", {
             "request": request,
             "responses": [],
             "error": str(e),
@@ -3,15 +3,12 @@ from dotenv import load_dotenv
 from fastapi import FastAPI, Request
 from fastapi.responses import PlainTextResponse
 from fastapi.templating import Jinja2Templates
-from supabase import create_client, Client
 from fastapi.middleware.cors import CORSMiddleware
 
 load_dotenv()
 
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_ANON_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+# Shared Supabase client (single keep-alive connection pool) and Postgres pool
+from linguist import auth, db_helpers
 
 fastapi_app = FastAPI()
 
@@ -31,14 +28,44 @@ fastapi_app.add_middleware(
     allow_headers=["*"],
 )
 
+class CurrentUserMiddleware:
+    """Resolve the session user once per request and expose it as request.state.user.
+    Plain ASGI rather than @app.middleware("http"), so streamed pages pass straight through."""
+
+    # Sign-in pages and callbacks never read the user
+    PUBLIC_PATHS = ("/linguist/login", "/linguist/signup", "/linguist/auth/")
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            user = None
+            path = scope["path"]
+            if scope["method"] != "OPTIONS" and path.startswith("/linguist") and not path.startswith(self.PUBLIC_PATHS):
+                user = await auth.get_current_user(Request(scope))
+            scope.setdefault("state", {})["user"] = user
+        await self.app(scope, receive, send)
+
+fastapi_app.add_middleware(CurrentUserMiddleware)
+
 @fastapi_app.get("/status")
 def status():
     return {"message": "FastAPI app running"}
 
 # Import and include the linguist router
-from linguist.routes import router as linguist_router
+from linguist.routes import router as linguist_router, warm_templates
 fastapi_app.include_router(linguist_router)
 
+@fastapi_app.on_event("startup")
+async def startup():
+    await db_helpers.init_pool()
+    warm_templates()
+
+@fastapi_app.on_event("shutdown")
+async def shutdown():
+    await db_helpers.close_pool()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(fastapi_app, host="0.0.0.0", port=int(os.getenv('LOCAL_PORT', 5017)), log_level="info")
@@ -0,0 +1,7 @@
+-- Indexes backing the responses -> questions -> campaign_questions join
+-- used by get_campaign_responses. campaign_questions.campaign_id is already
+-- covered by the (campaign_id, question_id) primary key.
+-- Run outside a transaction (CREATE INDEX CONCURRENTLY).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS responses_question_id_idx ON responses(question_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS cq_question_id_idx ON campaign_questions(question_id);
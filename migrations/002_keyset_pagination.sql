@@ -0,0 +1,13 @@
+-- Keyset pagination for the project and campaign lists
+-- (ORDER BY created_at DESC, id DESC LIMIT n, WHERE (created_at, id) < cursor).
+-- id breaks ties between rows sharing a timestamp, and created_at becomes
+-- NOT NULL so every row has a cursor position.
+-- Run outside a transaction (CREATE INDEX CONCURRENTLY).
+
+UPDATE projects SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE projects ALTER COLUMN created_at SET NOT NULL;
+UPDATE campaigns SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE campaigns ALTER COLUMN created_at SET NOT NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS projects_created_at_id_idx ON projects(created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS campaigns_created_at_id_idx ON campaigns(created_at DESC, id DESC);
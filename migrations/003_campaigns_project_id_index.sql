@@ -0,0 +1,15 @@
+-- Foreign-key index for campaigns.project_id, used by get_project_campaigns
+-- (WHERE project_id = ? ORDER BY created_at DESC, id DESC) and by ON DELETE CASCADE
+-- from projects. The other join/filter columns are already indexed:
+--   campaign_questions.campaign_id  -> leading column of the primary key
+--   responses.question_id           -> responses_question_id_idx (001)
+--   users.id                        -> primary key
+-- Run outside a transaction (CREATE INDEX CONCURRENTLY).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS campaigns_project_id_created_at_id_idx ON campaigns(project_id, created_at DESC, id DESC);
+
+-- Verify each plan shows an Index Scan rather than a Seq Scan:
+-- EXPLAIN ANALYZE SELECT * FROM campaigns WHERE project_id = 1 ORDER BY created_at DESC, id DESC LIMIT 50;
+-- EXPLAIN ANALYZE SELECT * FROM campaign_questions WHERE campaign_id = 1;
+-- EXPLAIN ANALYZE SELECT * FROM responses WHERE question_id = 1;
+-- EXPLAIN ANALYZE SELECT * FROM users WHERE id = 1;
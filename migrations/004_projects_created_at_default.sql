@@ -0,0 +1,3 @@
+-- Let Postgres stamp projects.created_at; create_project no longer sends it.
+
+ALTER TABLE projects ALTER COLUMN created_at SET DEFAULT now();
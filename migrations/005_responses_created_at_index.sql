@@ -0,0 +1,16 @@
+-- Covering index for get_all_responses (ORDER BY created_at DESC LIMIT 100,
+-- joined to questions on question_id), so the newest rows are read straight
+-- off the index instead of a top-N sort over the whole table.
+-- Run outside a transaction (CREATE INDEX CONCURRENTLY).
+
+CREATE EXTENSION IF NOT EXISTS pg_stat_statements;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS responses_created_at_desc_idx ON responses(created_at DESC) INCLUDE (question_id);
+
+-- Find the hottest statements:
+-- SELECT query, calls, mean_exec_time FROM pg_stat_statements ORDER BY total_exec_time DESC LIMIT 20;
+-- Verify the plan shows an Index Scan on responses_created_at_desc_idx and no Sort node:
+-- EXPLAIN (ANALYZE, BUFFERS)
+--   SELECT r.id, r.created_at, q.input_text
+--   FROM responses r LEFT JOIN questions q ON q.id = r.question_id
+--   ORDER BY r.created_at DESC LIMIT 100;
@@ -18,7 +18,7 @@ CREATE TABLE projects (
     ui_language VARCHAR(10) NOT NULL, -- ISO 639 code for interface language
     target_language VARCHAR(10) NOT NULL, -- ISO 639 code for language being documented
     created_by BIGINT REFERENCES users(id) ON DELETE SET NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Link users to projects they're involved in
@@ -60,7 +60,7 @@ CREATE TABLE campaigns (
     name VARCHAR(255) NOT NULL, -- "Verb morphology round 1", "Kinship terms"
     description TEXT,
     active BOOLEAN DEFAULT true,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Question templates and instances
@@ -256,6 +256,17 @@ CREATE TABLE ai_prompt_logs (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- ============================================
+-- Indexes
+-- ============================================
+
+CREATE INDEX responses_question_id_idx ON responses(question_id);
+CREATE INDEX cq_question_id_idx ON campaign_questions(question_id);
+CREATE INDEX projects_created_at_id_idx ON projects(created_at DESC, id DESC);
+CREATE INDEX campaigns_created_at_id_idx ON campaigns(created_at DESC, id DESC);
+CREATE INDEX campaigns_project_id_created_at_id_idx ON campaigns(project_id, created_at DESC, id DESC);
+CREATE INDEX responses_created_at_desc_idx ON responses(created_at DESC) INCLUDE (question_id);
+
 -- ============================================
 -- Row Level Security (RLS) Policies
 -- ============================================